@@ -46,7 +46,7 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ---------- LOAD LEADERBOARDS ----------
-@st.cache_data
+@st.cache_data(ttl=3600)
 def load_board(gender):
     try:
         df = pd.read_csv(f"data/leaderboard_{gender}_2025.csv")
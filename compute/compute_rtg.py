@@ -1,15 +1,22 @@
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import os
+import pickle
 import re
-import unicodedata
 
 # ---------------- CONFIG ----------------
 SEASON = 2025
+GENDERS = ("men", "women")
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 BOX_DIR = DATA_DIR / "boxscores"          # expects subfolders men/, women/
 TEAM_DIR = DATA_DIR / "teamstats"         # expects subfolders men/, women/
 OUT_TMPL = DATA_DIR / "leaderboard_{gender}_{season}.csv"
+CACHE_DIR = DATA_DIR / ".cache"           # parsed-CSV cache, keyed on file names + mtimes
+LOADER_VERSION = 1                        # bump whenever parsing in _load_all changes
 
 # Per-game blend (minutes vs. stats)
 W_MINUTE = 0.30
@@ -19,92 +26,194 @@ W_STATS  = 0.70
 OFF_POINTS_W   = 0.80   # weight on PTS inside off_raw
 OFF_SUPPORT_W  = 0.20   # weight on creation/2nd-chance (AST/OREB)
 
+# Shooting efficiency
+FT_WEIGHT = 0.44        # FTA -> shot-attempt equivalent
+LEAGUE_TS = 0.55        # baseline TS% that earns a neutral ts_scale of 1.0
+
 # Display scale so numbers feel like "WAR-ish" bands
-SCALE = 10.0
+SCALE = 4.0   # ↓ was 10, smaller for realistic range
 ROUND_DEC = 1
 # ----------------------------------------
 
+# Columns actually read from each input; everything else is skipped at parse time
+BOX_STATS = ["FGM","FGA","FTM","FTA","OREB","DREB","AST","STL","BLK","TO","PF","PTS"]
+BOX_COLS = ["game_id","team_name","player_name","MIN"] + BOX_STATS
+TEAM_MIN_ALIASES = ["team minutes","minutes","MIN","min","gmin","GMIN"]
+TEAM_COLS = ["game_id","team_name","team_min"] + TEAM_MIN_ALIASES
+
+_WS_RE = re.compile(r"\s+")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
 
-def _read_csv_any_encoding(path: Path) -> pd.DataFrame:
+
+def _read_csv_any_encoding(path: Path, usecols=None) -> pd.DataFrame:
     """Robust CSV reader for BOM/latin1/NBSP issues."""
     for enc in ("utf-8-sig", "utf-8", "latin1"):
         try:
-            return pd.read_csv(path, encoding=enc, engine="python")
+            return pd.read_csv(path, encoding=enc, usecols=usecols)
         except UnicodeDecodeError:
             continue
-    return pd.read_csv(path, engine="python")
+    return pd.read_csv(path, usecols=usecols)
 
 
-def _normalize_name(s: str) -> str:
-    if pd.isna(s):
-        return ""
-    s = unicodedata.normalize("NFKD", str(s)).replace("\xa0", " ")
-    return re.sub(r"\s+", " ", s).strip()
+def _normalize_names(s: pd.Series) -> pd.Series:
+    """NFKD-normalize, replace NBSPs, collapse whitespace and strip a whole column."""
+    s = s.fillna("").astype(str)
+    # Names/keys repeat across every game: clean each distinct value once, then expand
+    codes, uniques = pd.factorize(s)
+    u = pd.Series(uniques)
+    # Most values are plain ASCII; only run NFKD/NBSP cleanup on the ones that are not
+    non_ascii = u.str.contains(_NON_ASCII_RE)
+    if non_ascii.any():
+        u = u.mask(non_ascii, u[non_ascii].str.normalize("NFKD").str.replace("\xa0", " ", regex=False))
+    u = u.str.replace(_WS_RE, " ", regex=True).str.strip()
+    return pd.Series(u.to_numpy()[codes], index=s.index, name=s.name)
 
 
-def _load_all(folder: Path) -> pd.DataFrame:
+def _load_all(folder: Path, columns: list[str]) -> pd.DataFrame:
+    """Concatenate every CSV in folder, parsing only the given columns."""
     files = sorted(folder.glob("*.csv"))
-    dfs = []
-    for f in files:
-        df = _read_csv_any_encoding(f)
-        df["__source_file"] = f.name
-        dfs.append(df)
-    if not dfs:
+    if not files:
         return pd.DataFrame()
-    return pd.concat(dfs, ignore_index=True)
 
+    # Reuse the last parse while no CSV in the folder was added, removed or touched
+    # and neither the loader nor pandas changed
+    stamp = "|".join([f"v{LOADER_VERSION}", pd.__version__, ",".join(columns)]
+                     + [f"{f.name}:{f.stat().st_mtime_ns}" for f in files])
+    digest = hashlib.blake2b(stamp.encode(), digest_size=8).hexdigest()
+    prefix = f"{folder.parent.name}_{folder.name}"
+    cache_path = CACHE_DIR / f"{prefix}_{digest}.pkl"
+    if cache_path.exists():
+        try:
+            return pd.read_pickle(cache_path)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            pass  # truncated or unreadable cache file -> re-parse
+
+    wanted = set(columns)
+    df = pd.concat([_read_csv_any_encoding(f, usecols=lambda c: c.strip() in wanted) for f in files],
+                   ignore_index=True)
+    if os.environ.get("CI"):
+        return df  # fresh checkout every run: a cache written here would never be read
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in CACHE_DIR.glob(f"{prefix}_*.pkl"):
+        stale.unlink()
+    df.to_pickle(cache_path)
+    return df
+
+
+def _write_csv(df: pd.DataFrame, path: Path) -> None:
+    """Write df through one large buffered handle instead of many small writes."""
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as fh:
+        df.to_csv(fh, index=False)
 
-def _coerce_numeric(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+
+def _coerce_numeric(df: pd.DataFrame, cols: list[str], dtype=np.float64) -> pd.DataFrame:
     for c in cols:
         if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0).astype(dtype)
         else:
-            df[c] = 0.0
+            df[c] = dtype(0.0)
     return df
 
 
-def _positive_share(series: pd.Series) -> pd.Series:
+def _align_categories(a: pd.DataFrame, b: pd.DataFrame, cols: list[str]) -> None:
+    """Give a[c] and b[c] one shared, sorted categorical dtype so joins compare int codes."""
+    for c in cols:
+        cats = union_categoricals([a[c].astype("category"), b[c].astype("category")],
+                                  sort_categories=True).categories
+        a[c] = pd.Categorical(a[c], categories=cats)
+        b[c] = pd.Categorical(b[c], categories=cats)
+
+
+def _pair_codes(df: pd.DataFrame, key: list[str]) -> np.ndarray:
+    """Flatten the category codes of a two-column categorical key into one int64 per row."""
+    outer, inner = (df[k].cat.codes.to_numpy(dtype=np.int64) for k in key)
+    return outer * len(df[key[1]].cat.categories) + inner
+
+
+def _sorted_lookup(keys: np.ndarray, values: np.ndarray, probe: np.ndarray) -> np.ndarray:
+    """values[i] where keys[i] == probe (keys sorted and unique), NaN where there is no match."""
+    pos = np.minimum(np.searchsorted(keys, probe), len(keys) - 1)
+    return np.where(keys[pos] == probe, values[pos], np.nan)
+
+
+def _group_bounds(df: pd.DataFrame, key: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Start offsets and sizes of each run of equal keys (df must be sorted by key)."""
+    change = np.zeros(max(len(df) - 1, 0), dtype=bool)
+    for k in key:
+        change |= np.diff(df[k].cat.codes.to_numpy()) != 0
+    starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+    sizes = np.diff(np.append(starts, len(df)))
+    return starts, sizes
+
+
+def _positive_share(values: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> np.ndarray:
     """Return each value divided by the sum of positive values in its group."""
-    pos = series.clip(lower=0)
-    s = pos.sum()
-    if s <= 0:
-        return pd.Series(np.zeros(len(series)), index=series.index)
-    return pos / s
+    pos = np.clip(values, 0, None)
+    denom = np.repeat(np.add.reduceat(pos, starts), sizes)
+    return np.divide(pos, denom, out=np.zeros_like(pos), where=denom > 0)
 
 
-def process_gender(gender: str):
+def _raw_impact(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row offensive/defensive raw impact in one pass of in-place array ops."""
+    col = {c: df[c].to_numpy(dtype=np.float64) for c in BOX_STATS}
+
+    # Volume & efficiency dampers
+    shots = col["FGA"] + FT_WEIGHT*col["FTA"]
+    vol = shots + col["AST"]
+    np.divide(vol, 8.0, out=vol)
+    np.minimum(1.0, vol, out=vol)                         # full credit at ~8 actions
+    has_den = shots > 0
+    # TS% = PTS / (2*shots), then / LEAGUE_TS; kept as two divisions so values match bit-for-bit
+    ts_scale = np.divide(col["PTS"], 2.0 * shots, out=np.ones_like(shots), where=has_den)
+    np.divide(ts_scale, LEAGUE_TS, out=ts_scale, where=has_den)
+    np.clip(ts_scale, 0.6, 1.4, out=ts_scale)
+
+    support = 0.7*col["AST"] + 0.7*col["OREB"]
+    misses = (col["FGA"] - col["FGM"]) + 0.5*(col["FTA"] - col["FTM"]) + col["TO"]
+
+    off = OFF_POINTS_W * col["PTS"]
+    off += OFF_SUPPORT_W * support
+    off -= misses
+    off *= vol
+    off *= ts_scale
+
+    dfn = col["STL"] + 0.7*col["BLK"] + 0.3*col["DREB"] - 0.25*col["PF"]
+    return off, dfn
+
+
+def process_gender(gender: str) -> str:
+    """Build one league's leaderboard CSV and return a one-line summary of what was written."""
     box_path  = BOX_DIR  / gender
     team_path = TEAM_DIR / gender
     out_path  = OUT_TMPL.with_name(OUT_TMPL.name.format(gender=gender, season=SEASON))
 
     # ---- Load ----
-    boxes = _load_all(box_path)
-    teams = _load_all(team_path)
+    boxes = _load_all(box_path, BOX_COLS)
+    teams = _load_all(team_path, TEAM_COLS)
 
     if boxes.empty or teams.empty:
-        pd.DataFrame(columns=["player_name","team_name","games","Offense","Defense","Total"]).to_csv(out_path, index=False)
-        print(f"[{gender}] No data found. Wrote empty file: {out_path}")
-        return
+        _write_csv(pd.DataFrame(columns=["player_name","team_name","games","Offense","Defense","Total"]), out_path)
+        return f"[{gender}] No data found. Wrote empty file: {out_path}"
 
     # ---- Clean/standardize ----
-    boxes.columns = [c.strip() for c in boxes.columns]
-    teams.columns = [c.strip() for c in teams.columns]
+    boxes.columns = boxes.columns.str.strip()
+    teams.columns = teams.columns.str.strip()
 
-    for c in ("game_id","team_name","player_name"):
-        if c in boxes.columns:
-            boxes[c] = boxes[c].map(_normalize_name)
-    for c in ("game_id","team_name","opp_team_name"):
-        if c in teams.columns:
-            teams[c] = teams[c].map(_normalize_name)
+    boxes = boxes.assign(**{c: _normalize_names(boxes[c])
+                            for c in ("game_id","team_name","player_name") if c in boxes.columns})
+    teams = teams.assign(**{c: _normalize_names(teams[c])
+                            for c in ("game_id","team_name") if c in teams.columns})
 
     # Player numeric
-    box_num = ["MIN","FGM","FGA","3PM","3PA","FTM","FTA","OREB","DREB","REB","AST","STL","BLK","TO","PF","PTS"]
-    _coerce_numeric(boxes, box_num)
+    # Counting stats are small integers, exact in float32 at half the memory;
+    # minutes can be fractional so they stay float64.
+    _coerce_numeric(boxes, ["MIN"])
+    _coerce_numeric(boxes, BOX_STATS, dtype=np.float32)
 
     # Team minutes present? else fallback/rename/default to 40
     if "team_min" not in teams.columns:
         rename_key = None
-        for k in ("team minutes","minutes","MIN","min","gmin","GMIN"):
+        for k in TEAM_MIN_ALIASES:
             if k in teams.columns:
                 rename_key = k
                 break
@@ -119,61 +228,68 @@ def process_gender(gender: str):
     for k in key:
         if k not in boxes.columns or k not in teams.columns:
             raise SystemExit(f"[{gender}] Missing merge key '{k}' in box/team files.")
-    merged = boxes.merge(teams[key + ["team_min"]], on=key, how="left", validate="m:1")
-    merged["team_min"] = merged["team_min"].replace(0, np.nan).fillna(40.0)
-    merged["min_share"] = (merged["MIN"] / merged["team_min"]).clip(lower=0)
-
-    # ---- Offensive raw (points-heavy) ----
-    # Volume & efficiency dampers
-    merged["actions"] = merged["FGA"] + 0.44*merged["FTA"] + merged["AST"]
-    merged["vol_factor"] = np.minimum(1.0, merged["actions"] / 8.0)   # full credit at ~8 actions
-    ts_den = 2.0 * (merged["FGA"] + 0.44*merged["FTA"])
-    merged["ts_pct"] = np.where(ts_den > 0, merged["PTS"] / ts_den, 0.0)
-    merged["ts_scale"] = np.clip(np.where(ts_den > 0, merged["ts_pct"] / 0.55, 1.0), 0.6, 1.4)
-
-    support = 0.7*merged["AST"] + 0.7*merged["OREB"]
-    misses  = (merged["FGA"] - merged["FGM"]) + 0.5*(merged["FTA"] - merged["FTM"]) + merged["TO"]
-
-    merged["off_raw"] = (
-        OFF_POINTS_W  * merged["PTS"]
-        + OFF_SUPPORT_W * support
-        - misses
-    ) * merged["vol_factor"] * merged["ts_scale"]
-
-    # ---- Defensive raw ----
-    merged["def_raw"] = merged["STL"] + 0.7*merged["BLK"] + 0.3*merged["DREB"] - 0.25*merged["PF"]
+    _align_categories(boxes, teams, key)
+    boxes["player_name"] = boxes["player_name"].astype("category")
+    team_keys = _pair_codes(teams, key)
+    order = np.argsort(team_keys, kind="stable")
+    team_keys = team_keys[order]
+    if (np.diff(team_keys) == 0).any():
+        raise SystemExit(f"[{gender}] Duplicate team rows for a game in team files.")
+    # Sort once so each team-game is a contiguous run; per-game sums become reduceat scans
+    merged = boxes.sort_values(key, kind="stable", ignore_index=True)
+    team_min = _sorted_lookup(team_keys, teams["team_min"].to_numpy(dtype=np.float64)[order],
+                              _pair_codes(merged, key))
+    starts, sizes = _group_bounds(merged, key)
+    team_min[np.isnan(team_min) | (team_min == 0)] = 40.0
+    min_share = np.clip(merged["MIN"].to_numpy(dtype=np.float64) / team_min, 0, None)
+
+    # ---- Offensive (points-heavy) & defensive raw ----
+    off_raw, def_raw = _raw_impact(merged)
 
     # ---- Within-game positive shares ----
-    merged["off_share"] = merged.groupby(key, group_keys=False)["off_raw"].apply(_positive_share)
-    merged["def_share"] = merged.groupby(key, group_keys=False)["def_raw"].apply(_positive_share)
+    off_share = _positive_share(off_raw, starts, sizes)
+    def_share = _positive_share(def_raw, starts, sizes)
 
     # ---- Per-game blended scores ----
-    merged["Off_game"] = W_MINUTE * merged["min_share"] + W_STATS * merged["off_share"]
-    merged["Def_game"] = W_MINUTE * merged["min_share"] + W_STATS * merged["def_share"]
-    merged["Total_game"] = merged["Off_game"] + merged["Def_game"]
+    # Only the group keys and per-game scores go into the season groupby,
+    # not the ~20 raw stat columns carried on `merged`.
+    blended = np.column_stack((off_share, def_share))
+    blended *= W_STATS
+    blended += (W_MINUTE * min_share)[:, None]
+    off_game, def_game = blended[:, 0], blended[:, 1]
+    grp_cols = ["player_name","team_name"]
+    per_game = merged[grp_cols + ["game_id"]].assign(Off_game=off_game,
+                                                     Def_game=def_game,
+                                                     Total_game=off_game + def_game)
 
     # ---- Aggregate season ----
-    grp_cols = ["player_name","team_name"]
-    agg = (merged
-           .groupby(grp_cols, as_index=False)
+    agg = (per_game
+           .groupby(grp_cols, as_index=False, observed=True, sort=False)
            .agg(games=("game_id","nunique"),
                 Offense=("Off_game","sum"),
                 Defense=("Def_game","sum"),
                 Total=("Total_game","sum")))
 
     # Scale for readability and round
-    SCALE = 4.0  # ↓ was 10, smaller for realistic range
-    for c in ("Offense","Defense","Total"):
-        agg[c] = (agg[c] * SCALE).round(ROUND_DEC)
+    score_cols = ["Offense","Defense","Total"]
+    scores = agg[score_cols].to_numpy(dtype=np.float64, copy=True)
+    np.multiply(scores, SCALE, out=scores)
+    np.round(scores, ROUND_DEC, out=scores)
+    agg[score_cols] = scores
     # Sort and save
-    agg = agg.sort_values("Total", ascending=False).reset_index(drop=True)
-    agg.to_csv(out_path, index=False)
-    print(f"[{gender}] Wrote {len(agg)} rows -> {out_path}")
+    # Ties on Total are broken by name so the order never depends on groupby output order
+    agg = agg.sort_values(["Total"] + grp_cols, ascending=[False, True, True],
+                          kind="stable", ignore_index=True)
+    _write_csv(agg, out_path)
+    return f"[{gender}] Wrote {len(agg)} rows -> {out_path}"
 
 
 def main():
-    for g in ("men","women"):
-        process_gender(g)
+    # Leagues share no inputs or outputs, so run them side by side; workers return
+    # their summaries so the log prints in GENDERS order rather than finish order
+    with ProcessPoolExecutor(max_workers=len(GENDERS)) as ex:
+        for summary in ex.map(process_gender, GENDERS):
+            print(summary)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -13,15 +13,30 @@ SEASON = 2025
 data_file = f"leaderboard_{gender.lower()}_{SEASON}.csv"
 data_path = Path(__file__).parent / "data" / data_file
 
-@st.cache_data
+# Filter columns are low-cardinality labels; read them as categoricals
+CATEGORY_COLS = {"team_name": "category", "pos": "category", "class": "category"}
+
+# Above this many rows the table uses ProgressColumn bars instead of Styler gradients
+STYLER_MAX_ROWS = 500
+
+# Metric columns whose dataset-wide max anchors the color gradients
+SCALE_COLS = ("oWAR","dWAR","tWAR","oNP80","dNP80","tNP80","oNet","dNet","tNet")
+
+@st.cache_data(ttl=3600)
 def load(file):
+    """Leaderboard with the per-80 columns derived once, plus each metric's max for color scales."""
     if file.exists():
-        return pd.read_csv(file)
+        df = pd.read_csv(file, dtype=CATEGORY_COLS)
+        if {"oNet","dNet"} <= set(df.columns):
+            df["oNP80"] = df["oNet"] * (80/100)
+            df["dNP80"] = df["dNet"] * (80/100)
+            df["tNP80"] = df["oNP80"] + df["dNP80"]
+        return df, {c: df[c].max() for c in SCALE_COLS if c in df}
     else:
         st.warning(f"No leaderboard found yet for {gender}. Run compute script to generate it.")
-        return pd.DataFrame()
+        return pd.DataFrame(), {}
 
-df = load(data_path)
+df, col_max = load(data_path)
 if df.empty:
     st.stop()
 
@@ -46,10 +61,18 @@ st.markdown(
 )
 
 # --- Filters ---
+@st.cache_data(ttl=3600, max_entries=8)
+def get_options(df):
+    teams = sorted(df["team_name"].dropna().unique().tolist())
+    positions = sorted([x for x in df["pos"].dropna().unique().tolist() if x])
+    classes = sorted([x for x in df["class"].dropna().unique().tolist() if x])
+    return teams, positions, classes
+
+team_opts, pos_opts, class_opts = get_options(df)
 c1, c2, c3, c4 = st.columns(4)
-teams = ["All"] + sorted(df["team_name"].dropna().unique().tolist())
-positions = ["All"] + sorted([x for x in df["pos"].dropna().unique().tolist() if x])
-classes = ["All"] + sorted([x for x in df["class"].dropna().unique().tolist() if x])
+teams = ["All"] + team_opts
+positions = ["All"] + pos_opts
+classes = ["All"] + class_opts
 
 season = c1.selectbox("Season", [SEASON], index=0)
 team = c2.selectbox("Team", teams, index=0)
@@ -59,29 +82,32 @@ cls  = c4.selectbox("Class", classes, index=0)
 # --- Metric View ---
 metric_mode = st.radio("Metric View", ["WAR", "Net Points / 80 Poss", "Net Points (per-100)"], horizontal=True)
 
-dfv = df.copy()
-if team != "All": dfv = dfv[dfv.team_name == team]
-if pos  != "All": dfv = dfv[dfv.pos == pos]
-if cls  != "All": dfv = dfv[dfv["class"] == cls]
-
-# --- Derive display columns by mode ---
-if metric_mode == "WAR":
-    o_col, d_col, t_col = "oWAR", "dWAR", "tWAR"
-    labels = ("oWAR","dWAR","tWAR")
-elif metric_mode == "Net Points / 80 Poss":
-    dfv["oNP80"] = dfv["oNet"] * (80/100)
-    dfv["dNP80"] = dfv["dNet"] * (80/100)
-    dfv["tNP80"] = dfv["oNP80"] + dfv["dNP80"]
-    o_col, d_col, t_col = "oNP80","dNP80","tNP80"
-    labels = ("oNet/80","dNet/80","tNet/80")
-else:
-    o_col, d_col, t_col = "oNet","dNet","tNet"
-    labels = ("oNet","dNet","tNet")
-
 # --- ESPN-style Sort Buttons ---
 sort_choice = st.segmented_control("SORT TABLE:", ["Offense","Defense","Total"], default="Total")
-order_col = {"Offense": o_col, "Defense": d_col, "Total": t_col}[sort_choice]
-dfv = dfv.sort_values(order_col, ascending=False)
+
+# display columns and labels per metric view
+METRIC_VIEWS = {
+    "WAR":                  (("oWAR","dWAR","tWAR"),    ("oWAR","dWAR","tWAR")),
+    "Net Points / 80 Poss": (("oNP80","dNP80","tNP80"), ("oNet/80","dNet/80","tNet/80")),
+    "Net Points (per-100)": (("oNet","dNet","tNet"),    ("oNet","dNet","tNet")),
+}
+
+@st.cache_data(ttl=3600, max_entries=256)
+def filter_and_rank(df, team, pos, cls, metric_mode, sort_choice):
+    """Filtered rows for one selection, ranked by the chosen metric column."""
+    # one combined mask, one gather; no copy at all when every filter is "All"
+    mask = pd.Series(True, index=df.index)
+    if team != "All": mask &= df.team_name.eq(team)
+    if pos  != "All": mask &= df.pos.eq(pos)
+    if cls  != "All": mask &= df["class"].eq(cls)
+    dfv = df if mask.all() else df.loc[mask]
+
+    o_col, d_col, t_col = METRIC_VIEWS[metric_mode][0]
+    order_col = {"Offense": o_col, "Defense": d_col, "Total": t_col}[sort_choice]
+    return dfv.sort_values(order_col, ascending=False)
+
+(o_col, d_col, t_col), labels = METRIC_VIEWS[metric_mode]
+dfv = filter_and_rank(df, team, pos, cls, metric_mode, sort_choice)
 
 # --- Display Leaderboard with Coloring ---
 show_cols = ["player_name","team_name","pos","class","G", o_col, d_col, t_col]
@@ -89,14 +115,18 @@ ren = {"player_name":"PLAYER","team_name":"TEAM","pos":"POS","class":"CLASS","G"
        o_col:labels[0], d_col:labels[1], t_col:labels[2]}
 
 # lock color scale across dataset (like ESPN)
-max_owar = df[o_col].max() if o_col in df else None
-max_dwar = df[d_col].max() if d_col in df else None
-max_twar = df[t_col].max() if t_col in df else None
-
-styled = dfv[show_cols].rename(columns=ren).style
-if max_owar: styled = styled.background_gradient(subset=[labels[0]], cmap="Reds", vmin=0, vmax=max_owar)
-if max_dwar: styled = styled.background_gradient(subset=[labels[1]], cmap="Greens", vmin=0, vmax=max_dwar)
-if max_twar: styled = styled.background_gradient(subset=[labels[2]], cmap="Greys", vmin=0, vmax=max_twar)
-
-st.dataframe(styled, use_container_width=True, hide_index=True)
+max_owar, max_dwar, max_twar = col_max.get(o_col), col_max.get(d_col), col_max.get(t_col)
+
+table = dfv[show_cols].rename(columns=ren)
+if len(table) > STYLER_MAX_ROWS:
+    # Styler ships per-cell CSS; past this size draw client-side progress bars instead
+    cfg = {lab: st.column_config.ProgressColumn(lab, min_value=0, max_value=float(vmax), format="%.2f")
+           for lab, vmax in zip(labels, (max_owar, max_dwar, max_twar)) if vmax}
+    st.dataframe(table, column_config=cfg, use_container_width=True, hide_index=True)
+else:
+    styled = table.style
+    if max_owar: styled = styled.background_gradient(subset=[labels[0]], cmap="Reds", vmin=0, vmax=max_owar)
+    if max_dwar: styled = styled.background_gradient(subset=[labels[1]], cmap="Greens", vmin=0, vmax=max_dwar)
+    if max_twar: styled = styled.background_gradient(subset=[labels[2]], cmap="Greys", vmin=0, vmax=max_twar)
+    st.dataframe(styled, use_container_width=True, hide_index=True)
 st.caption("oNet/dNet/tNet are per-100 possessions vs league average. WAR converts Net Points vs replacement into wins added.")